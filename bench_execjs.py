@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+# -*- coding: ascii -*-
+'''
+    Benchmarks of PyExecJS internals which do not need a JavaScript runtime.
+
+    $ python bench_execjs.py
+'''
+from __future__ import unicode_literals, print_function
+import re
+import timeit
+
+import execjs
+
+
+def regex_encode_unicode_codepoints(str):
+    '''The former implementation of execjs.encode_unicode_codepoints, for comparison.'''
+    codepoint_format = '\\u{0:04x}'.format
+
+    def codepoint(m):
+        return codepoint_format(ord(m.group(0)))
+
+    return re.sub('[^\x00-\x7f]', codepoint, str)
+
+
+scripts = [
+    ('ascii', "var message = 'Hello, world'; // comment\n"),
+    ('latin', "var message = 'Gr\u00fc\u00dfe, \u00e7a va?';\n"),
+    ('cjk', "var message = '\u4f60\u597d\u4e16\u754c\u3053\u3093\u306b\u3061\u306f';\n"),
+    ('emoji', "var message = 'ok \U0001f600\U0001f44d';\n"),
+]
+
+sizes = [10 ** 3, 10 ** 5, 10 ** 6]
+
+
+def bench_encode_unicode_codepoints():
+    print("encode_unicode_codepoints (ms per call)")
+    print("{0:<8}{1:>10}{2:>12}{3:>12}{4:>10}".format("script", "chars", "regex", "current", "speedup"))
+    for name, line in scripts:
+        for size in sizes:
+            source = line * (size // len(line) + 1)
+            number = max(1, 10 ** 6 // size)
+            before = timeit.timeit(lambda: regex_encode_unicode_codepoints(source), number=number) / number
+            after = timeit.timeit(lambda: execjs.encode_unicode_codepoints(source), number=number) / number
+            print("{0:<8}{1:>10}{2:>12.3f}{3:>12.3f}{4:>9.1f}x".format(
+                name, len(source), before * 1000, after * 1000, before / after))
+
+
+if __name__ == "__main__":
+    bench_encode_unicode_codepoints()
@@ -23,19 +23,32 @@ from __future__ import unicode_literals, division, with_statement
 '''
 
 from subprocess import Popen, PIPE, STDOUT
+import base64
+import binascii
+import codecs
+import contextlib
 import io
+import itertools
 import json
 import os
 import os.path
 import platform
 import re
+import select
+import shutil
 import stat
 import sys
 import tempfile
+import threading
+import time
 
 import six
 
 import execjs._json2
+from execjs._cache import CallCache
+from execjs._lease import Lease
+from execjs import _files, _profile
+from execjs._profile import Profile
 
 try:
     from collections import OrderedDict
@@ -45,8 +58,8 @@ except ImportError:
 from . import runtimes_config
 
 __all__ = """
-    get register runtimes get_from_environment exec_ eval compile
-    ExternalRuntime Context
+    get register runtimes get_from_environment exec_ eval compile compile_files
+    ExternalRuntime PersistentRuntime SocketRuntime Context FileContext CallCache Profile
     Error RuntimeError ProgramError RuntimeUnavailable
 """.split()
 
@@ -69,7 +82,12 @@ class RuntimeUnavailable(RuntimeError):
 
 def register(name, runtime):
     '''Register a JavaScript runtime.'''
-    _runtimes[name] = runtime
+    global _runtimes
+    with _runtimes_lock:
+        # Copy on write, so that readers can use _runtimes without locking.
+        runtimes = OrderedDict(_runtimes)
+        runtimes[name] = runtime
+        _runtimes = runtimes
 
 
 def get(name=None):
@@ -141,6 +159,11 @@ def compile(source):
     return get().compile(source)
 
 
+def compile_files(paths, encoding='utf8'):
+    '''Compile the concatenation of files, and recompile it whenever one of them changes.'''
+    return FileContext(get(), paths, encoding)
+
+
 def _root():
     return os.path.abspath(os.path.dirname(__file__))
 
@@ -188,14 +211,61 @@ def _which(command):
     return [path] + args
 
 
+class _Context:
+    '''Calls shared by the contexts of all runtimes. Subclasses implement _call(identifier, args).'''
+    # Whether exec_ and eval can change what later calls return; such contexts clear call_cache after them.
+    _stateful = False
+
+    def __init__(self):
+        self.call_cache = CallCache()
+
+    def call(self, identifier, *args, **kwargs):
+        '''
+            Call the function identifier with args.
+            With cache=True the function is assumed to be pure and its result is kept in self.call_cache.
+        '''
+        if kwargs.pop('cache', False):
+            return self.call_cache.call(identifier, args, lambda: self._call(identifier, args, **kwargs))
+        return self._call(identifier, args, **kwargs)
+
+    def function(self, identifier, pure=False):
+        '''Return a Python callable calling identifier; results are cached if pure is True.'''
+        return _Function(self, identifier, pure)
+
+    def profile(self, source, heap=False, directory=None):
+        raise RuntimeError("this runtime does not support profiling")
+
+
+class _Function:
+    def __init__(self, context, identifier, pure):
+        self._context = context
+        self._identifier = identifier
+        self._pure = pure
+
+    def __repr__(self):
+        return "<{class_name} {identifier}{pure}>".format(
+            class_name=type(self).__name__,
+            identifier=self._identifier,
+            pure=" (pure)" if self._pure else "",
+        )
+
+    def __call__(self, *args, **kwargs):
+        return self._context.call(self._identifier, *args, cache=self._pure, **kwargs)
+
+
 class ExternalRuntime:
-    def __init__(self, name, command, runner_source, encoding='utf8'):
+    def __init__(self, name, command, runner_source, encoding='utf8', escape_unicode=True, runner_variants=(),
+                 profile_args=None):
         self._name = name
         if isinstance(command, str):
             command = [command]
         self._command = command
         self._runner_source = runner_source
         self._encoding = encoding
+        self._escape_unicode = escape_unicode
+        self._runner_variants = list(runner_variants)
+        self._profile_args = profile_args
+        self._lock = threading.RLock()
 
     def __str__(self):
         return "{class_name}({runtime_name})".format(
@@ -226,17 +296,56 @@ class ExternalRuntime:
         return self._binary() is not None
 
     def runner_source(self):
+        '''
+            Return the first of runner_variants, given as (required capabilities, runner source) pairs,
+            which the engine supports, or the default runner source.
+        '''
+        if self._runner_variants:
+            capabilities = self.capabilities()
+            for required, runner_source in self._runner_variants:
+                if all(capabilities[name] for name in required):
+                    return runner_source
         return self._runner_source
 
+    def capabilities(self):
+        '''
+            Return which features the engine supports, as a dict with the keys
+            json (native JSON), utf8 (reads and writes UTF-8) and promise.
+            The engine is probed once, with the default runner source.
+        '''
+        if not hasattr(self, "_capabilities_cache"):
+            with self._lock:
+                if not hasattr(self, "_capabilities_cache"):
+                    self._capabilities_cache = self._probe()
+        return dict(self._capabilities_cache)
+
+    def _probe(self):
+        """protected"""
+        utf8 = codecs.lookup(self._encoding).name == 'utf-8'
+        probe = ExternalRuntime(self._name, self._command, self._runner_source, self._encoding, escape_unicode=False)
+        try:
+            result = probe.exec_(_probe_source.replace('#{utf8_probe}', '\u3042' if utf8 else ''))
+        except Error:
+            result = None
+        if not isinstance(result, dict):
+            result = {}
+        return {
+            'json': result.get('json') is True,
+            'utf8': utf8 and result.get('utf8') == '\u3042',
+            'promise': result.get('promise') is True,
+        }
+
     def _binary(self):
         """protected"""
         if not hasattr(self, "_binary_cache"):
-            self._binary_cache = _which(self._command)
+            with self._lock:
+                if not hasattr(self, "_binary_cache"):
+                    self._binary_cache = _which(self._command)
         return self._binary_cache
 
-    def _execfile(self, filename):
+    def _execfile(self, filename, args=()):
         """protected"""
-        cmd = self._binary() + [filename]
+        cmd = self._binary() + list(args) + [filename]
 
         p = None
         try:
@@ -251,21 +360,57 @@ class ExternalRuntime:
         else:
             raise RuntimeError(stdoutdata)
 
-    class Context:
+    class Context(_Context):
         def __init__(self, runtime, source=''):
+            _Context.__init__(self)
             self._runtime = runtime
             self._source = source
+            self._escaped_source = None
 
         def eval(self, source):
-            if not source.strip():
-                data = "''"
-            else:
-                data = "'('+" + json.dumps(source, ensure_ascii=True) + "+')'"
-
-            code = 'return eval({data})'.format(data=data)
-            return self.exec_(code)
+            return self.exec_(self._eval_code(source))
 
         def exec_(self, source):
+            return self._exec(source)
+
+        def profile(self, source, heap=False, directory=None):
+            '''
+                Execute source like exec_ under the runtime's CPU profiler, and also its sampling heap
+                profiler if heap is True. The profiles are saved in directory (default: a new temporary directory).
+                The heap profile of a whole process only samples objects which are alive when it exits.
+            '''
+            profile_args = self._runtime._profile_args
+            if not profile_args:
+                raise RuntimeError("{name} does not support profiling".format(name=self._runtime.name))
+            created = directory is None
+            if created:
+                directory = tempfile.mkdtemp(prefix='execjs-profile')
+
+            paths = {}
+            args = []
+            try:
+                for kind in (['cpu', 'heap'] if heap else ['cpu']):
+                    (fd, paths[kind]) = tempfile.mkstemp(prefix='execjs', suffix='.' + kind + 'profile', dir=directory)
+                    os.close(fd)
+                    name = os.path.basename(paths[kind])
+                    args += [arg.format(directory=directory, name=name) for arg in profile_args[kind]]
+                result = self._exec(source, args)
+            except:
+                if created:
+                    shutil.rmtree(directory, ignore_errors=True)
+                else:
+                    for path in paths.values():
+                        os.remove(path)
+                raise
+
+            return Profile(
+                result,
+                _profile._load(paths['cpu']), paths['cpu'],
+                _profile._load(paths['heap']) if heap else None, paths.get('heap'),
+            )
+
+        def _exec(self, source, args=()):
+            """protected"""
             if self._source:
                 source = self._source + '\n' + source
 
@@ -274,17 +419,35 @@ class ExternalRuntime:
             try:
                 with io.open(filename, "w+", encoding=self._runtime._encoding) as fp:
                     fp.write(self._compile(source))
-                output = self._runtime._execfile(filename)
+                output = self._runtime._execfile(filename, args)
             finally:
                 os.remove(filename)
 
             output = output.decode(self._runtime._encoding)
             output = output.replace("\r\n", "\n").replace("\r", "\n")
-            return self._extract_result(output.split("\n")[-2])
+            lines = output.split("\n")
+            if len(lines) < 2 or not lines[-2].startswith(('["ok"', '["err"')):
+                # Node.js exits when nothing is left to do, even if a returned Promise is still pending.
+                raise RuntimeError("program exited without a result; did a returned Promise never settle?")
+            return self._extract_result(lines[-2])
+
+        def _call(self, identifier, args):
+            """protected"""
+            return self.eval(self._call_code(identifier, args))
+
+        def _eval_code(self, source):
+            """protected"""
+            if not source.strip():
+                data = "''"
+            else:
+                data = "'('+" + json.dumps(source, ensure_ascii=True) + "+')'"
+
+            return 'return eval({data})'.format(data=data)
 
-        def call(self, identifier, *args):
+        def _call_code(self, identifier, args):
+            """protected"""
             args = json.dumps(args)
-            return self.eval("{identifier}.apply(this, {args})".format(identifier=identifier, args=args))
+            return "{identifier}.apply(this, {args})".format(identifier=identifier, args=args)
 
         def _compile(self, source):
             """protected"""
@@ -292,11 +455,7 @@ class ExternalRuntime:
 
             replacements = {
                 '#{source}': lambda: source,
-                '#{encoded_source}': lambda: json.dumps(
-                    "(function(){ " +
-                    encode_unicode_codepoints(source) +
-                    " })()"
-                ),
+                '#{encoded_source}': lambda: self._encode_source(source),
                 '#{json2_source}': execjs._json2._json2_source,
             }
 
@@ -306,15 +465,39 @@ class ExternalRuntime:
 
             return runner_source
 
+        def _encode_source(self, source):
+            """protected"""
+            source = "(function(){ " + self._escape(source) + " })()"
+            if self._runtime._escape_unicode:
+                return json.dumps(source)
+            # U+2028 and U+2029 terminate string literals before ES2019.
+            return json.dumps(source, ensure_ascii=False).replace('\u2028', '\\u2028').replace('\u2029', '\\u2029')
+
+        def _escape(self, source):
+            """protected"""
+            if not self._runtime._escape_unicode:
+                return source
+            # exec_ prepends the context source to every program; escape it only once.
+            prefix = self._source + '\n'
+            if self._source and source.startswith(prefix):
+                if self._escaped_source is None:
+                    self._escaped_source = encode_unicode_codepoints(prefix)
+                return self._escaped_source + encode_unicode_codepoints(source[len(prefix):])
+            return encode_unicode_codepoints(source)
+
         def _extract_result(self, output_last_line):
             """protected"""
             if not output_last_line:
-                status = value = None
+                ret = [None, None]
             else:
                 ret = json.loads(output_last_line)
-                if len(ret) == 1:
-                    ret = [ret[0], None]
-                status, value = ret
+            return self._unpack_result(ret)
+
+        def _unpack_result(self, ret):
+            """protected"""
+            if len(ret) == 1:
+                ret = [ret[0], None]
+            status, value = ret
 
             if status == "ok":
                 return value
@@ -324,6 +507,292 @@ class ExternalRuntime:
                 raise ProgramError(value)
 
 
+_probe_source = '''
+return {
+    json: typeof JSON == 'object' && typeof JSON.parse == 'function' && typeof JSON.stringify == 'function',
+    utf8: '#{utf8_probe}'.length == 1 ? '#{utf8_probe}' : null,
+    promise: typeof Promise == 'function'
+};
+'''
+
+
+class PersistentRuntime(ExternalRuntime):
+    '''
+        Keep one runtime process per context alive and talk to it with tagged requests.
+        The context source is loaded once; requests from several threads run concurrently
+        on the runtime's event loop and returned Promises are awaited.
+
+        Requests run in a sandboxed global object (a Node.js vm context). reset() and
+        isolate=True swap in a pristine one, which is prepared in advance while the process is idle.
+
+        compile(source, threads=N) loads the source in N worker threads of the one process
+        and sends each request to the least busy thread.
+
+        With compile(source, timeout=seconds), a program which runs longer, e.g. because it returned
+        a Promise which never settles, raises RuntimeError and the process is killed; it is
+        restarted by the next request.
+    '''
+    def exec_(self, source):
+        if not self.is_available():
+            raise RuntimeUnavailable()
+        with self.Context(self) as context:
+            return context.exec_(source)
+
+    def eval(self, source):
+        if not self.is_available():
+            raise RuntimeUnavailable()
+        with self.Context(self) as context:
+            return context.eval(source)
+
+    def compile(self, source, threads=0, timeout=None):
+        if not self.is_available():
+            raise RuntimeUnavailable()
+        return self.Context(self, source, threads, timeout)
+
+    class Context(ExternalRuntime.Context):
+        def __init__(self, runtime, source='', threads=0, timeout=None):
+            ExternalRuntime.Context.__init__(self, runtime, source)
+            self._threads = threads
+            self._timeout = timeout
+            self._shared = {}
+            self._worker = None
+            self._worker_lock = threading.Lock()
+
+        def __enter__(self):
+            return self
+
+        def __exit__(self, exc_type, exc_value, traceback):
+            self.close()
+
+        _stateful = True
+
+        def exec_(self, source, isolate=False):
+            try:
+                return self._run(source, isolate)
+            finally:
+                if not isolate:
+                    self.call_cache.clear()
+
+        def eval(self, source, isolate=False):
+            return self.exec_(self._eval_code(source), isolate=isolate)
+
+        def _call(self, identifier, args, isolate=False):
+            """protected"""
+            return self._run(self._eval_code(self._call_code(identifier, args)), isolate)
+
+        def _run(self, source, isolate=False):
+            """protected"""
+            request = {'op': 'exec', 'source': source, 'isolate': isolate}
+            return self._unpack_result(self._request(request))
+
+        def share(self, name, data):
+            '''
+                Expose bytes as the global Uint8Array `name`, backed by a SharedArrayBuffer
+                which all threads see without a copy. The array should be treated as read-only.
+            '''
+            data = bytes(data)
+            with self._worker_lock:
+                self._shared[name] = data
+                worker = self._worker
+            if worker is not None and worker.is_alive():
+                self._unpack_result(worker.request(self._share_request(name, data)))
+            self.call_cache.clear()
+
+        def profile(self, source, heap=False, directory=None):
+            '''Like ExternalRuntime.Context.profile, but profiles only source, with the inspector of the running process.'''
+            request = {'op': 'profile', 'source': source, 'heap': heap}
+            try:
+                profile = self._unpack_result(self._request(request))
+            finally:
+                self.call_cache.clear()
+            if directory is None:
+                directory = tempfile.mkdtemp(prefix='execjs-profile')
+
+            paths = {}
+            for kind in (['cpu', 'heap'] if heap else ['cpu']):
+                (fd, paths[kind]) = tempfile.mkstemp(prefix='execjs', suffix='.' + kind + 'profile', dir=directory)
+                os.close(fd)
+                _profile._save(profile[kind + 'profile'], paths[kind])
+
+            return Profile(
+                profile.get('result'),
+                profile['cpuprofile'], paths['cpu'],
+                profile.get('heapprofile'), paths.get('heap'),
+            )
+
+        def reset(self):
+            '''Discard global state changed by previous requests and restore the freshly loaded context source.'''
+            with self._worker_lock:
+                worker = self._worker
+            if worker is not None and worker.is_alive():
+                self._unpack_result(worker.request({'op': 'reset'}))
+            self.call_cache.clear()
+
+        def close(self):
+            '''Terminate the runtime process. It is restarted by the next request.'''
+            with self._worker_lock:
+                worker, self._worker = self._worker, None
+            if worker is not None:
+                worker.close()
+            self.call_cache.clear()
+
+        def _worker_or_start(self):
+            """protected"""
+            with self._worker_lock:
+                if self._worker is None or not self._worker.is_alive():
+                    cmd = self._runtime._binary() + ['-e', self._runtime.runner_source()]
+                    worker = _Worker(cmd, self._runtime._encoding)
+                    try:
+                        self._unpack_result(worker.request({
+                            'op': 'load',
+                            'source': self._source,
+                            'threads': self._threads,
+                        }))
+                        for name, data in self._shared.items():
+                            self._unpack_result(worker.request(self._share_request(name, data)))
+                    except:
+                        worker.close()
+                        raise
+                    if self._worker is not None:
+                        # Restarted after the process exited, which lost its state.
+                        self.call_cache.clear()
+                    self._worker = worker
+                return self._worker
+
+        def _request(self, request):
+            """protected"""
+            worker = self._worker_or_start()
+            try:
+                return worker.request(request, self._timeout)
+            except _Timeout:
+                # The process may be stuck in a loop; kill it, which fails the other pending requests.
+                with self._worker_lock:
+                    if self._worker is worker:
+                        self._worker = None
+                worker.kill()
+                self.call_cache.clear()
+                raise RuntimeError("no result within {0} seconds".format(self._timeout))
+
+        def _share_request(self, name, data):
+            """protected"""
+            return {'op': 'share', 'name': name, 'data': base64.b64encode(data).decode('ascii')}
+
+
+class _Worker:
+    def __init__(self, cmd, encoding):
+        self._encoding = encoding
+        self._process = Popen(cmd, stdin=PIPE, stdout=PIPE)
+        self._ids = itertools.count(1)
+        self._responses = _Responses(self._process.stdout, encoding)
+
+    def request(self, request, timeout=None):
+        with self._responses.lock:
+            request_id = next(self._ids)
+            line = json.dumps(dict(request, id=request_id)) + '\n'
+            pending = self._responses.expect(request_id)
+            try:
+                self._process.stdin.write(line.encode(self._encoding))
+                self._process.stdin.flush()
+            except (IOError, OSError):
+                pass  # the process has exited; the reader fails the pending request.
+        try:
+            return pending.wait(timeout)
+        except _Timeout:
+            self._responses.forget(request_id)
+            raise
+
+    def is_alive(self):
+        return self._process.poll() is None and not self._responses.closed
+
+    def close(self):
+        try:
+            self._process.stdin.close()
+        except (IOError, OSError):
+            pass
+        self._process.wait()
+        self._process.stdout.close()
+
+    def kill(self):
+        try:
+            self._process.kill()
+        except OSError:
+            pass  # already exited
+        self.close()
+
+
+class _Responses:
+    '''Match responses read from a worker's stdout to pending requests by their ID.'''
+    def __init__(self, stdout, encoding):
+        self.lock = threading.Lock()
+        self.closed = False
+        self._pending = {}
+        self._encoding = encoding
+        reader = threading.Thread(target=self._read, args=(stdout,))
+        reader.daemon = True
+        reader.start()
+
+    def expect(self, request_id):
+        """Must be called holding self.lock."""
+        pending = self._pending[request_id] = _Pending()
+        if self.closed:
+            self._fail_all()
+        return pending
+
+    def forget(self, request_id):
+        with self.lock:
+            self._pending.pop(request_id, None)
+
+    def _read(self, stdout):
+        try:
+            for line in iter(stdout.readline, b''):
+                try:
+                    response = json.loads(line.decode(self._encoding))
+                    with self.lock:
+                        pending = self._pending.pop(response['id'])
+                except (ValueError, KeyError, TypeError):
+                    continue  # not a response, e.g. a stray write to stdout
+                pending.set(response['result'])
+        except (IOError, OSError, ValueError):
+            pass
+        finally:
+            with self.lock:
+                self.closed = True
+                self._fail_all()
+
+    def _fail_all(self):
+        pending_list = list(self._pending.values())
+        self._pending.clear()
+        for pending in pending_list:
+            pending.fail(RuntimeError("the runtime process exited"))
+
+
+class _Pending:
+    def __init__(self):
+        self._event = threading.Event()
+        self._result = None
+        self._error = None
+
+    def set(self, result):
+        self._result = result
+        self._event.set()
+
+    def fail(self, error):
+        self._error = error
+        self._event.set()
+
+    def wait(self, timeout=None):
+        self._event.wait(timeout)
+        if not self._event.is_set():
+            raise _Timeout()
+        if self._error is not None:
+            raise self._error
+        return self._result
+
+
+class _Timeout(Exception):
+    pass
+
+
 def encode_unicode_codepoints(str):
     r"""
     >>> encode_unicode_codepoints("a") == 'a'
@@ -333,13 +802,35 @@ def encode_unicode_codepoints(str):
     True
     >>> encode_unicode_codepoints('\u4e16\u754c') == '\\u4e16\\u754c'
     True
+    >>> encode_unicode_codepoints('a\U0001f600') == 'a\\ud83d\\ude00'
+    True
     """
-    codepoint_format = '\\u{0:04x}'.format
+    if _is_ascii(str):
+        return str
+
+    # Escape all runs of non-ASCII characters at once: join them with NUL, which is ASCII and
+    # so cannot occur in a run, write every UTF-16 code unit as \uXXXX using slice assignments,
+    # then split on the escaped NUL to put the escaped runs back between the ASCII parts.
+    parts = _non_ascii_runs.split(str)
+    hexdigits = binascii.hexlify('\x00'.join(parts[1::2]).encode('utf-16-be', _lone_surrogates))
+    n = len(hexdigits) // 4
+    escaped = bytearray(6 * n)
+    escaped[0::6] = b'\\' * n
+    escaped[1::6] = b'u' * n
+    for i in range(4):
+        escaped[2 + i::6] = hexdigits[i::4]
+    parts[1::2] = escaped.decode('ascii').split('\\u0000')
+    return ''.join(parts)
+
 
-    def codepoint(m):
-        return codepoint_format(ord(m.group(0)))
+def _is_ascii(s):
+    if hasattr(s, 'isascii'):
+        return s.isascii()  # constant time for str on Python 3.7+
+    return _non_ascii_runs.search(s) is None
 
-    return re.sub('[^\x00-\x7f]', codepoint, str)
+
+_non_ascii_runs = re.compile('([^\x00-\x7f]+)')
+_lone_surrogates = 'surrogatepass' if six.PY3 else 'strict'
 
 
 class PyV8Runtime:
@@ -367,9 +858,11 @@ class PyV8Runtime:
     def is_available(self):
         return self._is_available
 
-    class Context:
+    class Context(_Context):
         def __init__(self, source=""):
+            _Context.__init__(self)
             self._source = source
+            self._encoded_source = encode_unicode_codepoints(source)
 
         def exec_(self, source):
             source = '''\
@@ -377,7 +870,7 @@ class PyV8Runtime:
                 {0};
                 {1};
             }})()'''.format(
-                encode_unicode_codepoints(self._source),
+                self._encoded_source,
                 encode_unicode_codepoints(source)
             )
             source = str(source)
@@ -398,9 +891,10 @@ class PyV8Runtime:
                 return self.convert(value)
 
         def eval(self, source):
-            return self.exec_('return ' + encode_unicode_codepoints(source))
+            return self.exec_('return ' + source)
 
-        def call(self, identifier, *args):
+        def _call(self, identifier, args):
+            """protected"""
             args = json.dumps(args)
             return self.eval("{identifier}.apply(this, {args})".format(identifier=identifier, args=args))
 
@@ -423,6 +917,265 @@ class PyV8Runtime:
             else:
                 return obj
 
+
+class FileContext(_Context):
+    '''
+        A context compiled from the concatenation of files. Before each request the files are
+        checked (at most every check_interval seconds), modified files are read again, and the
+        context is recompiled only if the content of some file actually changed.
+    '''
+    def __init__(self, runtime, paths, encoding='utf8', check_interval=0):
+        _Context.__init__(self)
+        self._runtime = runtime
+        self._files = [_files.SourceFile(path, encoding) for path in paths]
+        self._check_interval = check_interval
+        self._checked_at = None
+        self._lease = None  # of the compiled context, which is closed after requests using it finish
+        self._lock = threading.Lock()
+
+    def call(self, identifier, *args, **kwargs):
+        # Refresh before looking up call_cache, which is cleared if a file changed.
+        with self._use() as context:
+            if kwargs.pop('cache', False):
+                return self.call_cache.call(identifier, args, lambda: context.call(identifier, *args, **kwargs))
+            return context.call(identifier, *args, **kwargs)
+
+    def exec_(self, source, **kwargs):
+        with self._use(kwargs) as context:
+            return context.exec_(source, **kwargs)
+
+    def eval(self, source, **kwargs):
+        with self._use(kwargs) as context:
+            return context.eval(source, **kwargs)
+
+    def profile(self, source, **kwargs):
+        with self._use(kwargs) as context:
+            return context.profile(source, **kwargs)
+
+    def close(self):
+        with self._lock:
+            lease, self._lease = self._lease, None
+        if lease is not None:
+            lease.retire()
+
+    def refresh(self):
+        '''Return the compiled context, after recompiling it if a file changed.'''
+        with self._use() as context:
+            return context
+
+    def _call(self, identifier, args, **kwargs):
+        """protected"""
+        with self._use() as context:
+            return context.call(identifier, *args, **kwargs)
+
+    @contextlib.contextmanager
+    def _use(self, request_kwargs=None):
+        """protected"""
+        # exec_, eval and profile pass their keyword arguments; unless isolated, they can change the state.
+        retired = None
+        with self._lock:
+            now = time.time()
+            if self._lease is None or now - self._checked_at >= self._check_interval:
+                # Remember what was read only once it is compiled, so that a failed check
+                # (e.g. a file briefly missing while an editor saves it) is retried next time.
+                states = [f.check() for f in self._files]
+                changed = [state is not None and state[1] != f.digest for f, state in zip(self._files, states)]
+                if self._lease is None or any(changed):
+                    source = "\n".join(f.text if state is None else state[2] for f, state in zip(self._files, states))
+                    retired, self._lease = self._lease, Lease(self._runtime.compile(source))
+                    self.call_cache.clear()
+                for f, state in zip(self._files, states):
+                    if state is not None:
+                        f.commit(state)
+                self._checked_at = now
+            lease = self._lease
+            lease.acquire()
+        if retired is not None:
+            retired.retire()
+        try:
+            yield lease.context
+        finally:
+            lease.release()
+            if request_kwargs is not None and lease.context._stateful and not request_kwargs.get('isolate'):
+                self.call_cache.clear()
+
+
+class SocketRuntime:
+    '''
+        Forward compile/exec/eval/call to a server started by `python -m execjs serve --socket PATH`.
+        Up to pool_size idle connections are kept open and reused.
+    '''
+    def __init__(self, socket_path, pool_size=4):
+        self._socket_path = socket_path
+        self._pool_size = pool_size
+        self._pool = []
+        self._pool_lock = threading.Lock()
+
+    def __str__(self):
+        return "{class_name}({socket_path})".format(
+            class_name=type(self).__name__,
+            socket_path=self._socket_path,
+        )
+
+    @property
+    def name(self):
+        return "Socket({0})".format(self._socket_path)
+
+    def exec_(self, source):
+        return self.compile('').exec_(source)
+
+    def eval(self, source):
+        return self.compile('').eval(source)
+
+    def compile(self, source):
+        if not self.is_available():
+            raise RuntimeUnavailable()
+        return self.Context(self, source)
+
+    def is_available(self):
+        try:
+            return stat.S_ISSOCK(os.stat(self._socket_path).st_mode)
+        except OSError:
+            return False
+
+    def _request(self, request):
+        """protected"""
+        data = json.dumps(request).encode('utf8') + b'\n'
+        conn, reused = self._acquire()
+        try:
+            try:
+                conn.send(data)
+            except (IOError, OSError):
+                # A pooled connection may have been closed by a restarted server.
+                # Nothing was sent, so the request can be retried; once sent, it must not be run twice.
+                conn.close()
+                if not reused:
+                    raise
+                conn = self._connect()
+                conn.send(data)
+            response = conn.receive()
+        except (IOError, OSError, ValueError) as e:
+            conn.close()
+            raise RuntimeError("lost connection to {0}: {1}".format(self._socket_path, e))
+        except:
+            conn.close()
+            raise
+        self._release(conn)
+
+        if response['status'] == 'ok':
+            return response['value']
+        error_class = _socket_error_classes.get(response['type'], RuntimeError)
+        raise error_class(response['value'])
+
+    def _connect(self):
+        import socket
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            sock.connect(self._socket_path)
+        except:
+            sock.close()
+            raise
+        return _SocketConnection(sock)
+
+    def _acquire(self):
+        with self._pool_lock:
+            while self._pool:
+                conn = self._pool.pop()
+                if not conn.closed_by_peer():
+                    return conn, True
+                conn.close()
+        try:
+            return self._connect(), False
+        except (IOError, OSError) as e:
+            raise RuntimeUnavailable("cannot connect to {0}: {1}".format(self._socket_path, e))
+
+    def _release(self, conn):
+        with self._pool_lock:
+            if len(self._pool) < self._pool_size:
+                self._pool.append(conn)
+                return
+        conn.close()
+
+    class Context(_Context):
+        def __init__(self, runtime, source=''):
+            _Context.__init__(self)
+            self._runtime = runtime
+            self._source = source
+            self._id = self._compile()
+
+        # The server may keep contexts loaded, e.g. with NodePersistent.
+        _stateful = True
+
+        def exec_(self, source):
+            try:
+                return self._request({'op': 'exec', 'source': source})
+            finally:
+                self.call_cache.clear()
+
+        def eval(self, source):
+            try:
+                return self._request({'op': 'eval', 'source': source})
+            finally:
+                self.call_cache.clear()
+
+        def _call(self, identifier, args):
+            """protected"""
+            return self._request({'op': 'call', 'identifier': identifier, 'args': args})
+
+        def _compile(self):
+            return self._runtime._request({'op': 'compile', 'source': self._source})
+
+        def _request(self, request):
+            request['context'] = self._id
+            try:
+                return self._runtime._request(request)
+            except _UnknownContext:
+                # The server was restarted or evicted our context; compile it again.
+                request['context'] = self._id = self._compile()
+                self.call_cache.clear()
+                return self._runtime._request(request)
+
+
+class _SocketConnection:
+    def __init__(self, sock):
+        self._sock = sock
+        self._file = sock.makefile('rb')
+
+    def send(self, data):
+        self._sock.sendall(data)
+
+    def receive(self):
+        line = self._file.readline()
+        if not line:
+            raise IOError("connection closed")
+        return json.loads(line.decode('utf8'))
+
+    def closed_by_peer(self):
+        # An idle connection is readable only if the server closed it.
+        try:
+            readable, _, _ = select.select([self._sock], [], [], 0)
+        except (IOError, OSError, ValueError):
+            return True
+        return bool(readable)
+
+    def close(self):
+        self._file.close()
+        self._sock.close()
+
+
+class _UnknownContext(RuntimeError):
+    pass
+
+
+_socket_error_classes = {
+    'Error': Error,
+    'RuntimeError': RuntimeError,
+    'ProgramError': ProgramError,
+    'RuntimeUnavailable': RuntimeUnavailable,
+    'UnknownContext': _UnknownContext,
+}
+
+
 def _setup_runtimes():
     __runtimes = OrderedDict()
     for runtime_name in runtimes_config.runtime_preferred_order:
@@ -438,3 +1191,4 @@ def _setup_runtimes():
     return __runtimes
 
 _runtimes = _setup_runtimes()
+_runtimes_lock = threading.Lock()
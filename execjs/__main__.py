@@ -25,7 +25,26 @@ class PrintRuntimes(Action):
         parser.exit(message=buffer.getvalue())
 
 
+def serve(argv):
+    import execjs.server
+
+    parser = ArgumentParser(prog="python -m execjs serve")
+    parser.add_argument('--socket', action='store', dest='socket_path', required=True)
+    parser.add_argument('-r', '--runtime', action='store', dest='runtime')
+    parser.add_argument('--max-contexts', action='store', dest='max_contexts', type=int, default=32)
+    opts = parser.parse_args(argv)
+
+    runtime = execjs.get(opts.runtime) if opts.runtime else None
+    try:
+        execjs.server.serve(opts.socket_path, runtime, opts.max_contexts)
+    except KeyboardInterrupt:
+        pass
+
+
 def main():
+    if sys.argv[1:2] == ['serve']:
+        return serve(sys.argv[2:])
+
     parser = ArgumentParser()
     parser.add_argument('--print-available-runtimes', action=PrintRuntimes)
     parser.add_argument('-r', '--runtime', action='store', dest='runtime')
@@ -37,12 +56,7 @@ def main():
 
     runtime = execjs.get(opts.runtime)
 
-    codes = []
-    for f in opts.files:
-        with io.open(f, encoding=opts.files_encoding) as fp:
-            codes.append(fp.read())
-
-    context = runtime.compile("\n".join(codes))
+    context = execjs.FileContext(runtime, opts.files, opts.files_encoding)
     if opts.expr:
         if isinstance(opts.expr, bytes):
             expr = opts.expr.decode()
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+# -*- coding: ascii -*-
+from __future__ import unicode_literals, division, with_statement
+import copy
+import json
+import threading
+import time
+
+try:
+    from collections import OrderedDict
+except ImportError:
+    from ordereddict import OrderedDict
+
+
+class CallCache:
+    '''
+        Bounded LRU cache of results of calls to pure JavaScript functions.
+        Entries are keyed by the identifier and a canonical JSON encoding of the arguments,
+        and expire after ttl seconds if ttl is given.
+    '''
+    def __init__(self, maxsize=1024, ttl=None, clock=time.time):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._clock = clock
+        self._entries = OrderedDict()
+        self._generation = 0  # incremented by clear()
+        self._lock = threading.Lock()
+
+    def call(self, identifier, args, func):
+        '''Return the cached result of identifier(*args), or call func() to compute it.'''
+        key = json.dumps([identifier, args], sort_keys=True, separators=(',', ':'))
+        now = self._clock()
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is not None and (self.ttl is None or now - entry[1] < self.ttl):
+                self._entries[key] = entry
+                self.hits += 1
+                return _copy(entry[0])
+            self.misses += 1
+            generation = self._generation
+
+        value = func()
+        with self._lock:
+            # A result computed while the cache was cleared may be stale.
+            if generation != self._generation:
+                return value
+            self._entries[key] = (_copy(value), now)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._generation += 1
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'size': len(self._entries),
+                'maxsize': self.maxsize,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+            }
+
+    def __len__(self):
+        return len(self._entries)
+
+
+def _copy(value):
+    # Results are JSON values; only containers can be mutated by the caller.
+    if isinstance(value, (list, dict)):
+        return copy.deepcopy(value)
+    return value
@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+# -*- coding: ascii -*-
+from __future__ import unicode_literals, division, with_statement
+import hashlib
+import io
+import mmap
+import os
+
+import six
+
+# Files at least this large are decoded from a memory map instead of a copy read into memory.
+MMAP_THRESHOLD = 1024 * 1024
+
+
+class SourceFile:
+    '''A JavaScript file, read again only when its size or modification time changes.'''
+    def __init__(self, path, encoding='utf8'):
+        self.path = path
+        self.encoding = encoding
+        self.text = None
+        self.digest = None
+        self._stat = None
+
+    def check(self):
+        '''
+            Read the file if its size or modification time changed. Return its new state,
+            to be passed to commit(), or None if it is unchanged.
+        '''
+        st = os.stat(self.path)
+        stat_key = (st.st_size, getattr(st, 'st_mtime_ns', st.st_mtime))
+        if stat_key == self._stat:
+            return None
+        data = _read(self.path, st.st_size)
+        try:
+            digest = hashlib.sha1(data).hexdigest()
+            text = self.text if digest == self.digest else six.text_type(data, self.encoding)
+        finally:
+            if isinstance(data, mmap.mmap):
+                data.close()
+        return (stat_key, digest, text)
+
+    def commit(self, state):
+        '''Remember a state returned by check(). Return True if the content changed.'''
+        changed = state[1] != self.digest
+        self._stat, self.digest, self.text = state
+        return changed
+
+    def refresh(self):
+        '''Read the file if it was modified. Return True if its content changed.'''
+        state = self.check()
+        return state is not None and self.commit(state)
+
+
+def _read(path, size):
+    with io.open(path, 'rb') as fp:
+        if size >= MMAP_THRESHOLD:
+            return mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ)
+        return fp.read()
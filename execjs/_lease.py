@@ -0,0 +1,41 @@
+#!/usr/bin/env python3
+# -*- coding: ascii -*-
+from __future__ import unicode_literals, division, with_statement
+import threading
+
+
+class Lease:
+    '''
+        Count the requests using a context, so that it can be retired while in use
+        and is closed only when the last of them finishes.
+    '''
+    def __init__(self, context):
+        self.context = context
+        self._users = 0
+        self._retired = False
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        with self._lock:
+            self._users += 1
+        return self.context
+
+    def release(self):
+        with self._lock:
+            self._users -= 1
+            idle = self._retired and self._users == 0
+        if idle:
+            close(self.context)
+
+    def retire(self):
+        '''Close the context now if it is unused, or else when the last request releases it.'''
+        with self._lock:
+            self._retired = True
+            idle = self._users == 0
+        if idle:
+            close(self.context)
+
+
+def close(context):
+    if hasattr(context, 'close'):
+        context.close()
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+# -*- coding: ascii -*-
+from __future__ import unicode_literals, division, with_statement
+from collections import namedtuple
+import io
+import json
+
+import six
+
+
+FunctionStats = namedtuple('FunctionStats', 'name url line self_time samples')
+AllocationStats = namedtuple('AllocationStats', 'name url line self_size')
+
+
+class Profile:
+    '''
+        Result of Context.profile: the value returned by the program, the CPU profile and,
+        if requested, the sampling heap profile. The raw profiles are saved at cpuprofile_path
+        and heapprofile_path, and can be opened in Chrome DevTools or flame graph tools.
+    '''
+    def __init__(self, result, cpuprofile, cpuprofile_path, heapprofile=None, heapprofile_path=None):
+        self.result = result
+        self.cpuprofile = cpuprofile
+        self.cpuprofile_path = cpuprofile_path
+        self.heapprofile = heapprofile
+        self.heapprofile_path = heapprofile_path
+
+    def functions(self, limit=10):
+        '''Return the functions with the most self time (in seconds), in descending order.'''
+        nodes = dict((node['id'], node) for node in self.cpuprofile['nodes'])
+        samples = self.cpuprofile.get('samples', [])
+        # timeDeltas[i] is the time (in microseconds) before samples[i]; charge it to the previous sample.
+        deltas = self.cpuprofile.get('timeDeltas', [])[1:] + [0]
+
+        stats = {}
+        for node_id, delta in zip(samples, deltas):
+            key = _key(nodes[node_id]['callFrame'])
+            self_time, count = stats.get(key, (0, 0))
+            stats[key] = (self_time + delta, count + 1)
+
+        functions = [
+            FunctionStats(name, url, line, self_time / 1e6, count)
+            for (name, url, line), (self_time, count) in stats.items()
+        ]
+        functions.sort(key=lambda f: f.self_time, reverse=True)
+        return functions[:limit]
+
+    def allocations(self, limit=10):
+        '''Return the functions which allocated the most sampled bytes, in descending order.'''
+        if self.heapprofile is None:
+            return []
+
+        stats = {}
+        stack = [self.heapprofile['head']]
+        while stack:
+            node = stack.pop()
+            key = _key(node['callFrame'])
+            stats[key] = stats.get(key, 0) + node['selfSize']
+            stack.extend(node.get('children', []))
+
+        allocations = [
+            AllocationStats(name, url, line, self_size)
+            for (name, url, line), self_size in stats.items() if self_size
+        ]
+        allocations.sort(key=lambda a: a.self_size, reverse=True)
+        return allocations[:limit]
+
+
+def _key(call_frame):
+    # Line numbers are 0-based in profiles.
+    return (call_frame['functionName'] or '(anonymous)', call_frame['url'], call_frame['lineNumber'] + 1)
+
+
+def _load(path):
+    with io.open(path, encoding='utf8') as fp:
+        return json.load(fp)
+
+
+def _save(profile, path):
+    with io.open(path, 'w', encoding='utf8') as fp:
+        fp.write(six.text_type(json.dumps(profile, ensure_ascii=False)))
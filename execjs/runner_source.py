@@ -57,8 +57,7 @@ node = r"""(function(program, execJS) { execJS(program) })(function() { #{source
   var print = function(string) {
     process.stdout.write('' + string + '\n');
   };
-  try {
-    result = program();
+  var report = function(result) {
     print('')
     if (typeof result == 'undefined' && result !== null) {
       print('["ok"]');
@@ -69,11 +68,239 @@ node = r"""(function(program, execJS) { execJS(program) })(function() { #{source
         print('["err"]');
       }
     }
-  } catch (err) {
+  };
+  var fail = function(err) {
+    print('');
     print(JSON.stringify(['err', '' + err]));
+  };
+  try {
+    result = program();
+    if (result !== null && typeof result == 'object' && typeof result.then == 'function') {
+      result.then(report, fail);
+    } else {
+      report(result);
+    }
+  } catch (err) {
+    fail(err);
   }
 });"""
 
+node_worker = r"""(function worker(require) {
+  var vm = require('vm');
+  var workerThreads = require('worker_threads');
+  // Responses are the only output on stdout; anything user code prints goes to stderr.
+  var write = process.stdout.write.bind(process.stdout);
+  process.stdout.write = process.stderr.write.bind(process.stderr);
+  console.log = console.info = console.debug = console.error;
+
+  // Node.js globals (process, Buffer, fetch, performance, ...) which a new vm context lacks.
+  // `node -e` also defines module scope variables and a global for each builtin module,
+  // which scripts do not see; in scripts, `crypto` is the Web Crypto API.
+  var realmGlobals = vm.runInNewContext('Object.getOwnPropertyNames(globalThis)');
+  var skipped = require('module').builtinModules.filter(function(name) { return name != 'process'; })
+    .concat(['global', 'GLOBAL', 'root', 'module', 'exports', 'require', '__filename', '__dirname']);
+  var sharedGlobals = Object.getOwnPropertyNames(global).filter(function(name) {
+    return realmGlobals.indexOf(name) < 0 && skipped.indexOf(name) < 0;
+  });
+  var webcrypto = require('crypto').webcrypto;
+  var library = null, current = null, spare = null, shared = {};
+
+  // Run the library in a new vm context; its globals become the context's globals.
+  var fresh = function() {
+    var sandbox = {require: require};
+    sharedGlobals.forEach(function(name) {
+      try {
+        sandbox[name] = global[name];
+      } catch (err) {}
+    });
+    if (webcrypto) {
+      sandbox.crypto = webcrypto;
+    }
+    sandbox.global = sandbox;
+    Object.keys(shared).forEach(function(name) {
+      sandbox[name] = shared[name];
+    });
+    var context = vm.createContext(sandbox);
+    library.runInContext(context);
+    return context;
+  };
+  // Pristine contexts are prepared while idle, so reset and isolated requests do not wait for the library.
+  var prepareSpare = function() {
+    setImmediate(function() {
+      if (spare === null) {
+        try {
+          spare = fresh();
+        } catch (err) {}
+      }
+    });
+  };
+  var takeSpare = function() {
+    var context = spare || fresh();
+    spare = null;
+    prepareSpare();
+    return context;
+  };
+
+  var handlers = {
+    load: function(request) {
+      library = new vm.Script(request.source, {filename: 'context.js'});
+      current = fresh();
+      prepareSpare();
+    },
+    exec: function(request) {
+      var context = request.isolate ? takeSpare() : current;
+      return vm.runInContext('(function() { ' + request.source + '\n})', context)();
+    },
+    reset: function(request) {
+      current = takeSpare();
+    },
+    profile: function(request) {
+      var session = new (require('inspector').Session)();
+      var post = function(method, params) {
+        return new Promise(function(resolve, reject) {
+          session.post(method, params || {}, function(err, result) { err ? reject(err) : resolve(result); });
+        });
+      };
+      var profile = {};
+      var stop = function() {
+        return post('Profiler.stop').then(function(cpu) {
+          profile.cpuprofile = cpu.profile;
+          return request.heap ? post('HeapProfiler.stopSampling') : null;
+        }).then(function(heap) {
+          profile.heapprofile = heap ? heap.profile : null;
+          session.disconnect();
+        });
+      };
+
+      session.connect();
+      return post('Profiler.enable').then(function() {
+        return post('Profiler.start');
+      }).then(function() {
+        // Also count short-lived objects, which are the usual allocation hotspots.
+        return request.heap ? post('HeapProfiler.startSampling', {
+          includeObjectsCollectedByMajorGC: true,
+          includeObjectsCollectedByMinorGC: true
+        }) : null;
+      }).then(function() {
+        return handlers.exec(request);
+      }).then(function(result) {
+        profile.result = result;
+        return stop().then(function() { return profile; });
+      }, function(err) {
+        return stop().then(function() { throw err; });
+      });
+    },
+    share: function(request) {
+      shared[request.name] = new Uint8Array(request.buffer);
+      [current, spare].forEach(function(context) {
+        if (context !== null) {
+          context[request.name] = shared[request.name];
+        }
+      });
+    }
+  };
+  var encode = function(id, result) {
+    try {
+      return JSON.stringify({id: id, result: result});
+    } catch (err) {
+      return JSON.stringify({id: id, result: ['err', '' + err]});
+    }
+  };
+  var handle = function(request, respond) {
+    var result;
+    try {
+      result = handlers[request.op](request);
+    } catch (err) {
+      respond(encode(request.id, ['err', '' + err]));
+      return;
+    }
+    if (result !== null && typeof result == 'object' && typeof result.then == 'function') {
+      result.then(function(value) {
+        respond(encode(request.id, ['ok', value]));
+      }, function(err) {
+        respond(encode(request.id, ['err', '' + err]));
+      });
+    } else {
+      respond(encode(request.id, ['ok', result]));
+    }
+  };
+
+  if (!workerThreads.isMainThread) {
+    workerThreads.parentPort.on('message', function(request) {
+      handle(request, function(line) { workerThreads.parentPort.postMessage(line); });
+    });
+    return;
+  }
+
+  // With request.threads > 0 on load, the library is loaded in that many worker threads instead;
+  // exec requests go to the least busy thread and other requests to all of them.
+  var threads = [], broadcasts = {};
+  var print = function(line) {
+    write(line + '\n');
+  };
+  var startThreads = function(count) {
+    for (var i = 0; i < count; i++) {
+      var thread = new workerThreads.Worker('(' + worker + ')(require)', {eval: true});
+      thread.busy = 0;
+      thread.on('message', function(line) {
+        this.busy--;
+        var response = JSON.parse(line), broadcast = broadcasts[response.id];
+        if (!broadcast) {
+          print(line);
+          return;
+        }
+        if (!broadcast.failed) {
+          broadcast.line = line;
+          broadcast.failed = response.result[0] != 'ok';
+        }
+        if (--broadcast.remaining === 0) {
+          delete broadcasts[response.id];
+          print(broadcast.line);
+        }
+      });
+      thread.on('error', function(err) {
+        console.error(err);
+        process.exit(1);
+      });
+      // A thread which exits, e.g. by process.exit() in user code, would leave its requests unanswered;
+      // exit too, so the pending requests fail and the context restarts.
+      thread.on('exit', function(code) {
+        console.error('worker thread exited with code ' + code);
+        process.exit(1);
+      });
+      threads.push(thread);
+    }
+  };
+  var dispatch = function(request) {
+    if (request.op == 'share') {
+      var data = Buffer.from(request.data, 'base64');
+      request.buffer = new SharedArrayBuffer(data.length);
+      data.copy(Buffer.from(request.buffer));
+      delete request.data;
+    }
+    if (request.op == 'load' && request.threads > 0) {
+      startThreads(request.threads);
+    }
+    if (threads.length === 0) {
+      handle(request, print);
+    } else if (request.op == 'exec' || request.op == 'profile') {
+      var idlest = threads.reduce(function(a, b) { return b.busy < a.busy ? b : a; });
+      idlest.busy++;
+      idlest.postMessage(request);
+    } else {
+      broadcasts[request.id] = {remaining: threads.length, line: null, failed: false};
+      threads.forEach(function(thread) {
+        thread.busy++;
+        thread.postMessage(request);
+      });
+    }
+  };
+
+  require('readline').createInterface({input: process.stdin, terminal: false})
+    .on('line', function(line) { dispatch(JSON.parse(line)); })
+    .on('close', function() { process.exit(0); });
+})(require);"""
+
 phantomjs = r"""
 (function(program, execJS) { execJS(program) })(function() {
   return eval(#{encoded_source});
@@ -124,3 +351,23 @@ spidermonkey = r"""(function(program, execJS) { execJS(program) })(function() {
   }
 });
 """
+
+# Leaner runners for engines with native JSON, or which read UTF-8 source so that
+# the program need not be evaled from an escaped copy. See ExternalRuntime.runner_source.
+
+_encoded_program = """function() {
+  return eval(#{encoded_source});
+}"""
+
+_program = """function() { #{source}
+}"""
+
+javascriptcore_utf8 = javascriptcore.replace(_encoded_program, _program)
+
+jscript_native_json = jscript.replace("  #{json2_source}\n", "")
+
+phantomjs_utf8 = phantomjs.replace(_encoded_program, _program)
+
+slimerjs_utf8 = phantomjs_utf8
+
+spidermonkey_native_json = spidermonkey.replace("  #{json2_source}\n", "")
@@ -6,6 +6,7 @@ class RuntimeNames(object):
     javascriptcore = 'JavaScriptCore'
     jscript = 'JScript'
     node = 'Node'
+    node_persistent = 'NodePersistent'
     phantomjs = 'PhantomJS'
     pyv8 = 'PyV8'
     slimerjs = 'SlimerJS'
@@ -19,6 +20,7 @@ runtime_preferred_order = [
     RuntimeNames.jscript,
     RuntimeNames.phantomjs,
     RuntimeNames.slimerjs,
+    RuntimeNames.node_persistent,
 ]
 
 config = {
@@ -26,7 +28,8 @@ config = {
         'commands_to_try': ["/System/Library/Frameworks/JavaScriptCore.framework/Versions/A/Resources/jsc"],
         'kwargs': {
             'name': RuntimeNames.javascriptcore,
-            'runner_source': runner_source.javascriptcore
+            'runner_source': runner_source.javascriptcore,
+            'runner_variants': [(('utf8',), runner_source.javascriptcore_utf8)],
         },
     },
 
@@ -36,6 +39,7 @@ config = {
             'encoding': 'ascii',
             'name': RuntimeNames.jscript,
             'runner_source': runner_source.jscript,
+            'runner_variants': [(('json',), runner_source.jscript_native_json)],
         },
     },
 
@@ -44,15 +48,30 @@ config = {
         'kwargs': {
             'encoding': 'UTF-8',
             'name': "Node.js (V8)",
-            'runner_source': runner_source.node
+            'runner_source': runner_source.node,
+            'profile_args': {
+                'cpu': ['--cpu-prof', '--cpu-prof-dir={directory}', '--cpu-prof-name={name}'],
+                'heap': ['--heap-prof', '--heap-prof-dir={directory}', '--heap-prof-name={name}'],
+            },
         },
     },
 
+    RuntimeNames.node_persistent: {
+        'commands_to_try': ["nodejs", "node"],
+        'kwargs': {
+            'encoding': 'UTF-8',
+            'name': "Node.js (V8) persistent",
+            'runner_source': runner_source.node_worker
+        },
+        'runtime_type': 'PersistentRuntime',
+    },
+
     RuntimeNames.phantomjs: {
         'commands_to_try': [ 'phantomjs' ],
         'kwargs': {
             'name': RuntimeNames.phantomjs,
             'runner_source': runner_source.phantomjs,
+            'runner_variants': [(('utf8',), runner_source.phantomjs_utf8)],
         },
     },
 
@@ -67,6 +86,7 @@ config = {
         'kwargs': {
             'name': RuntimeNames.slimerjs,
             'runner_source': runner_source.slimerjs,
+            'runner_variants': [(('utf8',), runner_source.slimerjs_utf8)],
         },
     },
 
@@ -75,6 +95,7 @@ config = {
         'kwargs': {
             'name': RuntimeNames.spidermonkey,
             'runner_source': runner_source.spidermonkey,
+            'runner_variants': [(('json',), runner_source.spidermonkey_native_json)],
         },
         'alternate_names': ['Spidermonkey']
     },
@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+# -*- coding: ascii -*-
+from __future__ import unicode_literals, division, with_statement
+'''
+    Share compiled contexts between processes over a Unix socket.
+
+    The server hosts contexts compiled by a single runtime, and any number of
+    processes talk to it through execjs.SocketRuntime:
+
+>>> import execjs
+>>> execjs.register("Shared", execjs.SocketRuntime("/tmp/execjs.sock")) # doctest: +SKIP
+
+    Requests and responses are newline-delimited JSON objects.
+'''
+
+import hashlib
+import json
+import os
+import socket
+import stat
+import threading
+
+from six.moves import socketserver
+
+try:
+    from collections import OrderedDict
+except ImportError:
+    from ordereddict import OrderedDict
+
+import execjs
+from execjs._lease import Lease
+from execjs.runtimes_config import RuntimeNames
+
+
+def _is_listening(socket_path):
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(socket_path)
+    except socket.error:
+        return False
+    finally:
+        sock.close()
+    return True
+
+
+def _context_id(source):
+    return hashlib.sha1(source.encode('utf8')).hexdigest()
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    def handle(self):
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                break
+            response = self.server.dispatch(line.decode('utf8'))
+            self.wfile.write(json.dumps(response).encode('utf8') + b'\n')
+            self.wfile.flush()
+
+
+class Server(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, socket_path, runtime, max_contexts=32):
+        if os.path.exists(socket_path) and stat.S_ISSOCK(os.stat(socket_path).st_mode):
+            if _is_listening(socket_path):
+                raise execjs.RuntimeError("a server is already listening on {0}".format(socket_path))
+            os.remove(socket_path)  # left behind by a server which did not shut down cleanly
+        socketserver.UnixStreamServer.__init__(self, socket_path, _Handler)
+        self._runtime = runtime
+        self._max_contexts = max_contexts
+        self._contexts = OrderedDict()  # context id -> Lease, least recently used first
+        self._contexts_lock = threading.Lock()
+
+    def server_close(self):
+        socketserver.UnixStreamServer.server_close(self)
+        try:
+            os.remove(self.server_address)
+        except OSError:
+            pass
+        with self._contexts_lock:
+            leases, self._contexts = list(self._contexts.values()), OrderedDict()
+        for lease in leases:
+            lease.retire()
+
+    def dispatch(self, line):
+        try:
+            request = json.loads(line)
+            op = request['op']
+            if op == 'compile':
+                value = self._compile(request['source'])
+            elif op in ('exec', 'eval', 'call'):
+                lease = self._lease(request['context'])
+                try:
+                    if op == 'exec':
+                        value = lease.context.exec_(request['source'])
+                    elif op == 'eval':
+                        value = lease.context.eval(request['source'])
+                    else:
+                        value = lease.context.call(request['identifier'], *request['args'])
+                finally:
+                    lease.release()
+            else:
+                raise execjs.RuntimeError("unknown operation: {0}".format(op))
+        except execjs.Error as e:
+            return {'status': 'err', 'type': type(e).__name__, 'value': '{0}'.format(e)}
+        except (ValueError, KeyError, TypeError) as e:
+            return {'status': 'err', 'type': 'RuntimeError', 'value': 'bad request: {0}'.format(e)}
+        except Exception as e:
+            # Dropping the connection would make the client think the request was never run.
+            return {'status': 'err', 'type': 'RuntimeError', 'value': '{0}: {1}'.format(type(e).__name__, e)}
+        return {'status': 'ok', 'value': value}
+
+    def _compile(self, source):
+        context_id = _context_id(source)
+        evicted = []
+        with self._contexts_lock:
+            lease = self._contexts.pop(context_id, None)
+            if lease is None:
+                lease = Lease(self._runtime.compile(source))
+            self._contexts[context_id] = lease
+            while len(self._contexts) > self._max_contexts:
+                evicted.append(self._contexts.popitem(last=False)[1])
+        # Clients of evicted contexts get UnknownContext and compile them again.
+        for lease in evicted:
+            lease.retire()
+        return context_id
+
+    def _lease(self, context_id):
+        with self._contexts_lock:
+            try:
+                lease = self._contexts.pop(context_id)
+            except KeyError:
+                raise UnknownContext(context_id)
+            self._contexts[context_id] = lease
+            lease.acquire()
+        return lease
+
+
+class UnknownContext(execjs.RuntimeError):
+    pass
+
+
+def default_runtime():
+    '''
+        Return NodePersistent if it is available, since it keeps compiled contexts loaded
+        between requests, or else the automatically picked runtime.
+    '''
+    if execjs.get_from_environment() is None:
+        try:
+            return execjs.get(RuntimeNames.node_persistent)
+        except execjs.RuntimeUnavailable:
+            pass
+    return execjs.get()
+
+
+def serve(socket_path, runtime=None, max_contexts=32):
+    '''
+        Serve contexts of runtime (default: default_runtime()) on socket_path until interrupted.
+        At most max_contexts contexts are kept; the least recently used ones are closed.
+    '''
+    if runtime is None:
+        runtime = default_runtime()
+    server = Server(socket_path, runtime, max_contexts)
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
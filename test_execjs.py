@@ -3,6 +3,11 @@
 from __future__ import unicode_literals
 import sys
 import os
+import shutil
+import socket
+import tempfile
+import threading
+import time
 
 if sys.version_info < (2, 7):
     import unittest2 as unittest
@@ -85,6 +90,17 @@ class RuntimeTestBase:
         s = '#{source}#{encoded_source}#{json2_source}'
         self.assertEqual(s, self.runtime.eval('"' + s + '"'))
 
+    def test_call_cache(self):
+        context = self.runtime.compile("id = function(v) { return v; }")
+        self.assertEqual([1], context.call("id", [1], cache=True))
+        context.call("id", [1], cache=True).append(2)
+        self.assertEqual([1], context.call("id", [1], cache=True))
+        identity = context.function("id", pure=True)
+        self.assertEqual("bar", identity("bar"))
+        self.assertEqual("bar", identity("bar"))
+        stats = context.call_cache.stats()
+        self.assertEqual((3, 2, 2), (stats["hits"], stats["misses"], stats["size"]))
+
 
 class DefaultRuntimeTest(unittest.TestCase, RuntimeTestBase):
     def setUp(self):
@@ -103,6 +119,621 @@ for name, runtime in execjs.available_runtimes().items():
     exec("{class_name} = f()".format(class_name=class_name))
 
 
+def _get_available(name):
+    try:
+        return execjs.get(name)
+    except execjs.RuntimeUnavailable:
+        return None
+
+
+@unittest.skipUnless(_get_available("Node"), "Node is not available")
+class NodePromiseTest(unittest.TestCase):
+    def setUp(self):
+        self.runtime = execjs.get("Node")
+
+    def test_promise(self):
+        context = self.runtime.compile("async function twice(x) { return 2 * x; }")
+        self.assertEqual(6, context.call("twice", 3))
+        self.assertEqual("bar", self.runtime.eval("new Promise(function(resolve) { setTimeout(resolve, 10, 'bar'); })"))
+
+    def test_rejected_promise(self):
+        with self.assertRaises(execjs.ProgramError):
+            self.runtime.eval("Promise.reject(new Error('hello'))")
+
+    def test_unsettled_promise(self):
+        with self.assertRaises(execjs.RuntimeError):
+            self.runtime.eval("new Promise(function() {})")
+        with self.assertRaises(execjs.RuntimeError):
+            self.runtime.eval("(console.log('x'), new Promise(function() {}))")
+
+
+@unittest.skipUnless(_get_available("Node"), "Node is not available")
+class EncodedSourceTest(unittest.TestCase):
+    """Run the runner for engines without UTF-8 support, which evals an encoded copy of the source, on Node."""
+    def runtime(self, escape_unicode):
+        from execjs import runner_source
+        return execjs.ExternalRuntime(
+            "EncodedSource", execjs.get("Node")._command,
+            "var print = console.log;\n" + runner_source.javascriptcore,
+            escape_unicode=escape_unicode)
+
+    def test_escape_unicode(self):
+        for escape_unicode in (True, False):
+            context = self.runtime(escape_unicode).compile("var s = '\u4e16\u754c\U0001f600\u2028';")
+            self.assertEqual("\u4e16\u754c\U0001f600\u2028", context.eval("s"))
+            self.assertEqual(5, context.eval("s.length"))
+            self.assertEqual("\u3042", context.eval("'\u3042'"))
+
+
+@unittest.skipUnless(_get_available("Node"), "Node is not available")
+class RunnerVariantsTest(unittest.TestCase):
+    """Probe Node through the SpiderMonkey and JavaScriptCore runners."""
+    def runtime(self, runner_source, runner_variants):
+        shim = "var print = console.log;\n"
+        return execjs.ExternalRuntime(
+            "Probe", execjs.get("Node")._command, shim + runner_source,
+            runner_variants=[(required, shim + variant) for required, variant in runner_variants])
+
+    def test_capabilities(self):
+        from execjs import runner_source
+        runtime = self.runtime(runner_source.spidermonkey, [])
+        self.assertEqual({"json": True, "utf8": True, "promise": True}, runtime.capabilities())
+
+    def test_failed_probe(self):
+        runtime = execjs.ExternalRuntime("Probe", execjs.get("Node")._command, "syntax error")
+        self.assertEqual({"json": False, "utf8": False, "promise": False}, runtime.capabilities())
+
+    def test_lean_runners(self):
+        from execjs import runner_source
+        for default, variant, required in [
+            (runner_source.spidermonkey, runner_source.spidermonkey_native_json, "json"),
+            (runner_source.javascriptcore, runner_source.javascriptcore_utf8, "utf8"),
+        ]:
+            runtime = self.runtime(default, [((required,), variant)])
+            self.assertTrue(runtime.runner_source().endswith(variant))
+            context = runtime.compile("var s = '\u4e16\u754c';")
+            self.assertEqual({"s": "\u4e16\u754c"}, context.eval("{s: s}"))
+            self.assertEqual(3, context.call("Math.max", 1, 3, 2))
+
+
+class ProfileTestBase:
+    source = """
+        function fib(n) { return n < 2 ? n : fib(n - 1) + fib(n - 2); }
+        function allocate() {
+            var a = [];
+            for (var i = 0; i < 100000; i++) { a.push({i: i}); }
+            return a;
+        }
+    """
+
+    def test_profile(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        profile = self.context.profile("allocate(); return fib(27)", heap=True, directory=directory)
+        self.assertEqual(196418, profile.result)
+        self.assertIn("fib", [f.name for f in profile.functions(limit=None)])
+        self.assertTrue(all(a.self_size > 0 for a in profile.allocations()))
+        for path in (profile.cpuprofile_path, profile.heapprofile_path):
+            self.assertEqual(directory, os.path.dirname(path))
+            self.assertTrue(os.path.getsize(path))
+
+    def test_profile_error(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        with self.assertRaises(execjs.ProgramError):
+            self.context.profile("throw 'hello'", directory=directory)
+        self.assertEqual([], os.listdir(directory))
+
+
+@unittest.skipUnless(_get_available("Node"), "Node is not available")
+class NodeProfileTest(unittest.TestCase, ProfileTestBase):
+    def setUp(self):
+        self.context = execjs.get("Node").compile(self.source)
+
+    def test_profile_error_removes_temporary_directory(self):
+        orig_tempdir = tempfile.tempdir
+        tempfile.tempdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tempfile.tempdir)
+        try:
+            with self.assertRaises(execjs.ProgramError):
+                self.context.profile("throw 'hello'")
+            self.assertEqual([], os.listdir(tempfile.tempdir))
+        finally:
+            tempfile.tempdir = orig_tempdir
+
+    def test_unsupported(self):
+        runtime = execjs.ExternalRuntime("NoProfiler", execjs.get("Node")._command, execjs.get("Node")._runner_source)
+        with self.assertRaises(execjs.RuntimeError):
+            runtime.compile("").profile("return 1")
+
+
+@unittest.skipUnless(_get_available("NodePersistent"), "Node is not available")
+class PersistentProfileTest(unittest.TestCase, ProfileTestBase):
+    def setUp(self):
+        self.context = execjs.get("NodePersistent").compile(self.source)
+        self.addCleanup(self.context.close)
+
+    def test_allocations(self):
+        profile = self.context.profile("return allocate().length", heap=True)
+        self.assertEqual("allocate", profile.allocations()[0].name)
+
+
+@unittest.skipUnless(_get_available("NodePersistent"), "Node is not available")
+class PersistentRuntimeTest(unittest.TestCase):
+    def setUp(self):
+        self.runtime = execjs.get("NodePersistent")
+        self.context = self.runtime.compile("""
+            var counter = 0;
+            function increment() { return ++counter; }
+            function sleep(ms, value) {
+                return new Promise(function(resolve) { setTimeout(resolve, ms, value); });
+            }
+        """)
+
+    def tearDown(self):
+        self.context.close()
+
+    def test_state_is_kept(self):
+        self.assertEqual(1, self.context.call("increment"))
+        self.assertEqual(2, self.context.call("increment"))
+
+    def test_concurrent_requests(self):
+        results = {}
+
+        def call(i):
+            results[i] = self.context.call("sleep", 500, i)
+        self.context.call("increment")  # start the process
+
+        start = time.time()
+        threads = [threading.Thread(target=call, args=(i,)) for i in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertLess(time.time() - start, 2.0)
+        self.assertEqual(dict((i, i) for i in range(8)), results)
+
+    def test_node_globals(self):
+        source = "[typeof fetch, typeof performance.now, typeof structuredClone, typeof AbortController, typeof fs]"
+        self.assertEqual(execjs.get("Node").eval(source), self.context.eval(source))
+        self.assertEqual(["function", "function", "function", "function", "undefined"], self.context.eval(source))
+        self.assertTrue(self.context.eval("performance.now() > 0"))
+
+    def test_stdout_is_not_mixed_with_results(self):
+        self.assertEqual(1, self.context.exec_("console.log('[1]'); return 1"))
+        self.assertEqual(1, self.context.exec_("process.stdout.write('partial'); return 1"))
+        self.assertEqual(2, self.context.exec_("return 2"))
+
+    def test_timeout(self):
+        context = self.runtime.compile(self.context._source, timeout=0.5)
+        self.addCleanup(context.close)
+        self.assertEqual(1, context.call("increment"))
+        with self.assertRaises(execjs.RuntimeError):
+            context.eval("new Promise(function() {})")
+        with self.assertRaises(execjs.RuntimeError):
+            context.exec_("while (true) {}")
+        self.assertEqual(1, context.call("increment"))
+
+    def test_restart_after_exit(self):
+        self.assertEqual(1, self.context.call("increment"))
+        with self.assertRaises(execjs.RuntimeError):
+            self.context.exec_("process.exit(1)")
+        self.assertEqual(1, self.context.call("increment"))
+
+    def test_reset(self):
+        self.assertEqual(1, self.context.call("increment"))
+        self.context.exec_("increment = null; leaked = 1")
+        self.context.reset()
+        self.assertEqual(1, self.context.call("increment"))
+        self.assertEqual("undefined", self.context.eval("typeof leaked"))
+
+    def test_isolate(self):
+        self.assertEqual(1, self.context.call("increment"))
+        self.assertEqual(1, self.context.call("increment", isolate=True))
+        self.assertIsNone(self.context.exec_("leaked = 1", isolate=True))
+        self.assertEqual("undefined", self.context.eval("typeof leaked", isolate=True))
+        self.assertEqual(2, self.context.call("increment"))
+
+    def test_share(self):
+        self.context.share("data", b"\x01\x02\x03")
+        self.assertEqual(6, self.context.eval("data.reduce(function(a, b) { return a + b; })"))
+        self.context.reset()
+        self.assertEqual(3, self.context.eval("data.length"))
+
+    def test_threads(self):
+        context = self.runtime.compile("""
+            function busyThreadId(ms) {
+                var end = Date.now() + ms;
+                while (Date.now() < end) {}
+                return require('worker_threads').threadId;
+            }
+        """, threads=2)
+        self.addCleanup(context.close)
+        context.share("data", b"\x01\x02\x03")
+        self.assertEqual(3, context.eval("data.length"))
+
+        thread_ids = set()
+
+        def call():
+            thread_ids.add(context.call("busyThreadId", 200))
+        threads = [threading.Thread(target=call) for i in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(2, len(thread_ids))
+        self.assertNotIn(0, thread_ids)
+
+    def test_threads_restart_after_exit(self):
+        context = self.runtime.compile(self.context._source, threads=2)
+        self.addCleanup(context.close)
+        self.assertEqual(1, context.call("increment"))
+        with self.assertRaises(execjs.RuntimeError):
+            context.exec_("process.exit(1)")
+        self.assertEqual(1, context.call("increment"))
+
+    def test_threads_load_error(self):
+        context = self.runtime.compile("}", threads=2)
+        with self.assertRaises(execjs.RuntimeError):
+            context.eval("1")
+
+    def test_reset_clears_call_cache(self):
+        self.assertEqual(1, self.context.call("increment", cache=True))
+        self.assertEqual(1, self.context.call("increment", cache=True))
+        self.context.reset()
+        self.assertEqual(0, len(self.context.call_cache))
+
+    def test_exec_clears_call_cache(self):
+        self.context.exec_("f = function() { return 1; }")
+        self.assertEqual(1, self.context.call("f", cache=True))
+        self.context.exec_("f = function() { return 2; }")
+        self.assertEqual(2, self.context.call("f", cache=True))
+        self.assertEqual(2, self.context.call("f", cache=True))
+        self.context.eval("typeof f", isolate=True)
+        self.assertEqual(1, len(self.context.call_cache))
+
+    def test_load_error(self):
+        context = self.runtime.compile("}")
+        with self.assertRaises(execjs.RuntimeError):
+            context.eval("1")
+
+
+@unittest.skipUnless(hasattr(socket, "AF_UNIX"), "Unix sockets are not supported")
+class SocketRuntimeTest(unittest.TestCase, RuntimeTestBase):
+    @classmethod
+    def setUpClass(cls):
+        import execjs.server
+        cls.tempdir = tempfile.mkdtemp()
+        cls.socket_path = os.path.join(cls.tempdir, "execjs.sock")
+        cls.server = execjs.server.Server(cls.socket_path, execjs.get())
+        cls.thread = threading.Thread(target=cls.server.serve_forever)
+        cls.thread.daemon = True
+        cls.thread.start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        shutil.rmtree(cls.tempdir)
+
+    def setUp(self):
+        self.runtime = execjs.SocketRuntime(self.socket_path)
+
+    def test_contexts_are_shared(self):
+        source = "id = function(v) { return v; }"
+        context = self.runtime.compile(source)
+        other = execjs.SocketRuntime(self.socket_path).compile(source)
+        self.assertEqual(context._id, other._id)
+        self.assertIs(self.server._contexts[context._id], self.server._contexts[other._id])
+
+    def test_connections_are_pooled(self):
+        context = self.runtime.compile("")
+        for i in range(3):
+            context.eval("1")
+        self.assertEqual(1, len(self.runtime._pool))
+
+    def test_recompile_unknown_context(self):
+        context = self.runtime.compile("id = function(v) { return v; }")
+        self.server._contexts.clear()
+        self.assertEqual("bar", context.call("id", "bar"))
+
+    def test_server_error_is_reported_once(self):
+        calls = []
+
+        class BrokenContext:
+            def eval(self, source):
+                calls.append(source)
+                raise IndexError("list index out of range")
+        context = self.runtime.compile("")
+        context.eval("1")  # pool a connection
+        context._id = "broken"
+        self.server._contexts[context._id] = execjs._lease.Lease(BrokenContext())
+        with self.assertRaises(execjs.RuntimeError):
+            context.eval("1")
+        self.assertEqual(["1"], calls)
+        self.assertEqual(1, len(self.runtime._pool))
+
+    def test_least_recently_used_contexts_are_closed(self):
+        import execjs.server
+        closed = []
+
+        class Context:
+            def __init__(self, source):
+                self.source = source
+
+            def eval(self, source):
+                return self.source
+
+            def close(self):
+                closed.append(self.source)
+
+        class Runtime:
+            compile = Context
+
+        server = execjs.server.Server(os.path.join(self.tempdir, "lru.sock"), Runtime(), max_contexts=2)
+        self.addCleanup(server.server_close)
+        a, b = server._compile("a"), server._compile("b")
+        lease = server._lease(a)  # a request in progress
+        server._compile("c")
+        self.assertEqual(["b"], closed)
+        server._compile("d")
+        self.assertEqual(["b"], closed)
+        lease.release()
+        self.assertEqual(["b", "a"], closed)
+        with self.assertRaises(execjs.server.UnknownContext):
+            server._lease(b)
+
+    def test_socket_in_use(self):
+        import execjs.server
+        with self.assertRaises(execjs.RuntimeError):
+            execjs.server.Server(self.socket_path, execjs.get())
+        self.assertTrue(self.runtime.is_available())
+
+    def test_stale_socket_is_replaced(self):
+        import execjs.server
+        path = os.path.join(self.tempdir, "stale.sock")
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.bind(path)
+        sock.close()
+        server = execjs.server.Server(path, execjs.get())
+        server.server_close()
+
+    def test_unavailable(self):
+        runtime = execjs.SocketRuntime(os.path.join(self.tempdir, "nonexistent.sock"))
+        self.assertFalse(runtime.is_available())
+
+
+class FileContextTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        self.a = self.write("a.js", "function a() { return 'a'; }")
+        self.b = self.write("b.js", "function b() { return a() + 'b'; }")
+        self.context = execjs.compile_files([self.a, self.b])
+
+    def write(self, name, source, mtime=None):
+        path = os.path.join(self.directory, name)
+        with open(path, "wb") as fp:
+            fp.write(source.encode("utf8"))
+        if mtime is not None:
+            os.utime(path, (mtime, mtime))
+        return path
+
+    def test_compile_files(self):
+        self.assertEqual("ab", self.context.call("b"))
+        self.assertEqual("ab", self.context.eval("b()"))
+
+    def test_recompile_on_change(self):
+        compiled = self.context.refresh()
+        self.assertEqual("ab", self.context.call("b", cache=True))
+        self.write("a.js", "function a() { return '\u3042'; }", mtime=time.time() + 10)
+        self.assertEqual("\u3042b", self.context.call("b", cache=True))
+        self.assertIsNot(compiled, self.context.refresh())
+
+    def test_recompile_after_failed_check(self):
+        self.assertEqual("ab", self.context.call("b"))
+        self.write("a.js", "function a() { return 'A'; }", mtime=time.time() + 10)
+        os.rename(self.b, self.b + ".tmp")  # as in an atomic save
+        with self.assertRaises(OSError):
+            self.context.call("b")
+        os.rename(self.b + ".tmp", self.b)
+        self.assertEqual("Ab", self.context.call("b"))
+
+    def test_no_recompile_if_content_is_unchanged(self):
+        compiled = self.context.refresh()
+        self.write("b.js", "function b() { return a() + 'b'; }", mtime=time.time() + 10)
+        self.assertIs(compiled, self.context.refresh())
+
+    def test_check_interval(self):
+        context = execjs.FileContext(execjs.get(), [self.a], check_interval=3600)
+        self.assertEqual("a", context.call("a"))
+        self.write("a.js", "function a() { return 'A'; }", mtime=time.time() + 10)
+        self.assertEqual("a", context.call("a"))
+
+    @unittest.skipUnless(_get_available("NodePersistent"), "NodePersistent is not available")
+    def test_recompile_during_call(self):
+        path = self.write("c.js", "function sleep(ms, v) { return new Promise(function(r) { setTimeout(r, ms, v); }); }")
+        context = execjs.FileContext(execjs.get("NodePersistent"), [path])
+        self.addCleanup(context.close)
+        old = context.refresh()
+        results = []
+        thread = threading.Thread(target=lambda: results.append(context.call("sleep", 500, "old")))
+        thread.start()
+        time.sleep(0.2)
+        self.write("c.js", "function sleep(ms, v) { return 'new'; }", mtime=time.time() + 10)
+        self.assertEqual("new", context.call("sleep", 0, ""))
+        thread.join()
+        self.assertEqual(["old"], results)
+        self.assertIsNone(old._worker)
+
+    def test_mmap(self):
+        from execjs import _files
+        source_file = _files.SourceFile(self.write("c.js", "var c = '\u3042';"))
+        orig_threshold = _files.MMAP_THRESHOLD
+        _files.MMAP_THRESHOLD = 0
+        try:
+            self.assertTrue(source_file.refresh())
+        finally:
+            _files.MMAP_THRESHOLD = orig_threshold
+        self.assertEqual("var c = '\u3042';", source_file.text)
+        self.assertFalse(source_file.refresh())
+
+
+class CallCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.now = 0
+        self.cache = execjs.CallCache(maxsize=2, ttl=10, clock=lambda: self.now)
+        self.calls = 0
+
+    def call(self, *args):
+        def f():
+            self.calls += 1
+            return self.calls
+        return self.cache.call("f", args, f)
+
+    def test_lru(self):
+        self.assertEqual(1, self.call(1))
+        self.assertEqual(2, self.call(2))
+        self.assertEqual(1, self.call(1))
+        self.assertEqual(3, self.call(3))  # evicts f(2)
+        self.assertEqual(1, self.call(1))
+        self.assertEqual(4, self.call(2))
+
+    def test_canonical_arguments(self):
+        self.assertEqual(1, self.call({"a": 1, "b": 2}))
+        self.assertEqual(1, self.call({"b": 2, "a": 1}))
+        self.assertEqual(2, self.call(True))
+        self.assertEqual(3, self.call(1))
+
+    def test_ttl(self):
+        self.assertEqual(1, self.call())
+        self.now = 9
+        self.assertEqual(1, self.call())
+        self.now = 10
+        self.assertEqual(2, self.call())
+
+    def test_clear_during_call(self):
+        def f():
+            self.cache.clear()
+            return 1
+        self.assertEqual(1, self.cache.call("f", [], f))
+        self.assertEqual(0, len(self.cache))
+
+    def test_stats(self):
+        self.call()
+        self.call()
+        self.cache.clear()
+        self.assertEqual(
+            {"hits": 1, "misses": 1, "size": 0, "maxsize": 2, "hit_rate": 0.5},
+            self.cache.stats())
+
+
+class ThreadSafetyTest(unittest.TestCase):
+    def setUp(self):
+        self.runtimes = execjs._runtimes
+
+    def tearDown(self):
+        execjs._runtimes = self.runtimes
+
+    def run_threads(self, target, count=8):
+        errors = []
+
+        def run(i):
+            try:
+                target(i)
+            except Exception as e:
+                errors.append(e)
+        threads = [threading.Thread(target=run, args=(i,)) for i in range(count)]
+        for thread in threads:
+            thread.daemon = True
+            thread.start()
+        for thread in threads:
+            thread.join(60)
+            self.assertFalse(thread.is_alive(), "a thread is deadlocked")
+        self.assertEqual([], errors)
+
+    def test_register_while_reading(self):
+        def target(i):
+            for j in range(200):
+                if i % 2:
+                    execjs.register("Fail{0}_{1}".format(i, j), execjs.ExternalRuntime("fail", ["nonexistent"], ""))
+                else:
+                    list(execjs.runtimes())
+                    execjs.available_runtimes()
+        self.run_threads(target)
+        self.assertEqual(len(self.runtimes) + 4 * 200, len(execjs.runtimes()))
+
+    def test_probe_once(self):
+        probes = []
+
+        class Runtime(execjs.ExternalRuntime):
+            def _probe(self):
+                probes.append(1)
+                time.sleep(0.1)
+                return {"json": True}
+
+        runtime = Runtime("probe", ["nonexistent"], "")
+        self.run_threads(lambda i: self.assertEqual({"json": True}, runtime.capabilities()))
+        self.assertEqual(1, len(probes))
+
+    def test_call_cache(self):
+        cache = execjs.CallCache(maxsize=8)
+
+        def target(i):
+            for j in range(500):
+                key = (i + j) % 16
+                self.assertEqual(key * 2, cache.call("double", [key], lambda: key * 2))
+                if j % 50 == 0:
+                    cache.clear()
+        self.run_threads(target)
+        stats = cache.stats()
+        self.assertEqual(8 * 500, stats["hits"] + stats["misses"])
+        self.assertLessEqual(stats["size"], 8)
+
+    @unittest.skipUnless(_get_available("NodePersistent"), "NodePersistent is not available")
+    def test_persistent_context(self):
+        context = execjs.get("NodePersistent").compile("function add(x, y) { return x + y; }")
+        self.addCleanup(context.close)
+
+        def target(i):
+            for j in range(20):
+                if i == 0 and j % 5 == 0:
+                    context.reset()
+                elif i == 1 and j % 10 == 0:
+                    context.close()  # fails the requests in progress, restarts on the next one
+                try:
+                    self.assertEqual(i + j, context.call("add", i, j, cache=j % 2 == 0))
+                except execjs.RuntimeError as e:
+                    self.assertIn("exited", str(e))
+        self.run_threads(target)
+        self.assertEqual(3, context.call("add", 1, 2))
+
+    def test_file_context(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        path = os.path.join(directory, "version.js")
+        mtime = [time.time()]
+
+        def write(version):
+            with open(path + ".tmp", "w") as fp:
+                fp.write("function version() { return %d; }" % version)
+            mtime[0] += 10
+            os.utime(path + ".tmp", (mtime[0], mtime[0]))
+            os.rename(path + ".tmp", path)  # atomically
+        write(0)
+        runtime = _get_available("NodePersistent") or execjs.get()
+        context = execjs.FileContext(runtime, [path])
+        self.addCleanup(context.close)
+
+        def target(i):
+            for j in range(10):
+                if i == 0:
+                    write(j + 1)
+                self.assertIn(context.call("version"), range(11))
+        self.run_threads(target)
+        self.assertEqual(10, context.call("version"))
+
+
 class CommonTest(unittest.TestCase):
     def test_empty_path_environ(self):
         """